@@ -0,0 +1,255 @@
+import os
+import re
+import struct
+from collections import deque
+
+import numpy as np
+
+try:
+    import scipy.io as scipy_io
+except ImportError:
+    scipy_io = None
+
+HISTORY_MAGIC = b"CAH1"
+HISTORY_HEADER = struct.Struct("<cII")
+HISTORY_RECORD_BYTES = 16 * 1024
+HISTORY_DTYPES = "fdFD"
+
+
+def parse_complex(value):
+    try:
+        val = value.lower().replace('i', 'j')
+        val = val.replace(',', "")
+        val = re.sub(r'\s+', '', val)
+        val = re.sub(r'(?<![\d.])j(\d+(\.\d+)?)(?![\d.])', r'\1j', val)
+        val = re.sub(r'(?<=[\+\-])j(?![\d.])', '1j', val)
+        val = re.sub(r'^j$', '1j', val)
+        number = complex(val)
+        return number.real if number.imag == 0 else number
+    except Exception:
+        raise ValueError(f"Invalid complex number format: {value}")
+
+
+# Plain numbers go through NumPy's own conversion in one call; only rows holding complex
+# values fall back to parse_complex for each token.
+def parse_numbers(tokens):
+    try:
+        return np.array(tokens, dtype=float)
+    except ValueError:
+        return np.array([parse_complex(token) for token in tokens])
+
+
+def split_row(line):
+    if re.search(r'[,;\t]', line):
+        return [token for token in re.split(r'\s*[,;\t]\s*', line.strip()) if token]
+    return line.split()
+
+
+def parse_rows(lines):
+    rows = []
+    for line in lines:
+        tokens = split_row(line)
+        if not tokens or tokens[0].startswith(('#', '%')):
+            continue
+        rows.append(parse_numbers(tokens))
+        if len(rows[-1]) != len(rows[0]):
+            raise ValueError(f"Row {len(rows)} has {len(rows[-1])} values, expected {len(rows[0])}")
+    if not rows:
+        raise ValueError("No values found")
+    return np.array(rows)
+
+
+def parse_matlab(text):
+    matrices = []
+    for literal in re.findall(r'\[(.*?)\]', text, re.S):
+        rows = [row for row in re.split(r'[;\n]', literal) if row.strip()]
+        matrices.append(parse_rows(row.replace(',', ' ') for row in rows))
+    return matrices
+
+
+# A system is stored either as the augmented matrix [A | b] or as A and b separately.
+def split_augmented(matrix):
+    n = len(matrix)
+    if matrix.ndim != 2 or matrix.shape[1] < n:
+        raise ValueError(f"Expected an augmented matrix [A | b] with {n} rows, got shape {matrix.shape}")
+    A, b = matrix[:, :n], matrix[:, n:]
+    if b.shape[1] == 0:
+        return A, np.zeros(n, dtype=A.dtype)
+    return A, (b[:, 0] if b.shape[1] == 1 else b)
+
+
+def join_system(A, b):
+    A, b = np.asarray(A), np.asarray(b)
+    return np.column_stack([A, b.reshape(len(A), -1)])
+
+
+def check_system(A, b):
+    A, b = np.asarray(A), np.asarray(b)
+    if A.ndim != 2 or A.shape[0] != A.shape[1] or len(b) != len(A):
+        raise ValueError(f"A must be square and b must have one row per equation, got {A.shape} and {b.shape}")
+    return A, b
+
+
+def parse_system_text(text):
+    if '[' in text:
+        matrices = parse_matlab(text)
+        if len(matrices) == 1:
+            return split_augmented(matrices[0])
+        if len(matrices) == 2:
+            A, b = matrices
+            if 1 in b.shape:
+                b = b.ravel()
+            return check_system(A, b)
+        raise ValueError("Expected either [A b] or separate [A] and [b] literals")
+    return split_augmented(parse_rows(text.splitlines()))
+
+
+def load_system(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        A, b = split_augmented(np.load(path, mmap_mode="r"))
+        return np.array(A), np.array(b)
+    if extension == ".npz":
+        with np.load(path) as data:
+            return check_system(data["A"], data["b"])
+    if extension == ".mat":
+        if scipy_io is None:
+            raise ValueError("Reading .mat files requires SciPy")
+        data = scipy_io.loadmat(path)
+        A, b = (data[key].toarray() if hasattr(data[key], "toarray") else data[key] for key in ("A", "b"))
+        if 1 in b.shape:
+            b = b.ravel()
+        return check_system(A, b)
+
+    with open(path, encoding="utf-8") as file:
+        first = file.read(4096)
+        file.seek(0)
+        if '[' in first:
+            return parse_system_text(file.read())
+        return split_augmented(parse_rows(file))
+
+
+# G and C of the pencil G + s C for modal analysis. .mat files keep sparse matrices sparse; .npz files
+# (np.savez) hold dense arrays.
+def load_pencil(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npz":
+        with np.load(path) as data:
+            G, C = data["G"], data["C"]
+    elif extension == ".mat":
+        if scipy_io is None:
+            raise ValueError("Reading .mat files requires SciPy")
+        data = scipy_io.loadmat(path)
+        G, C = data["G"], data["C"]
+    else:
+        raise ValueError("Modal analysis needs a .mat or .npz file holding G and C")
+    if G.shape != C.shape or G.shape[0] != G.shape[1]:
+        raise ValueError(f"G and C must be square and the same size, got {G.shape} and {C.shape}")
+    return G, C
+
+
+def format_number(value):
+    if np.iscomplexobj(value):
+        return f"{value.real:.17g}{value.imag:+.17g}j"
+    return f"{value:.17g}"
+
+
+def format_matlab(matrix):
+    return "[" + "; ".join(" ".join(format_number(value) for value in row) for row in matrix) + "]"
+
+
+def save_system(path, A, b):
+    A, b = check_system(A, b)
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".npy":
+        np.save(path, join_system(A, b))
+    elif extension == ".npz":
+        np.savez(path, A=A, b=b)
+    elif extension == ".mat":
+        if scipy_io is None:
+            raise ValueError("Writing .mat files requires SciPy")
+        scipy_io.savemat(path, {"A": A, "b": b.reshape(len(A), -1)})
+    elif extension == ".m":
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(f"A = {format_matlab(A)};\nb = {format_matlab(b.reshape(len(A), -1))};\n")
+    else:
+        with open(path, "w", encoding="utf-8") as file:
+            for row in join_system(A, b):
+                file.write(",".join(format_number(value) for value in row) + "\n")
+
+
+# Solve history file: a magic number followed by appended records. Each record is a header
+# (dtype code, n, number of b columns or 0 for a vector) and the raw bytes of A, b and x.
+# Records above HISTORY_RECORD_BYTES (large imported systems) are not kept, in the file or in memory.
+def history_record_size(A, b, x):
+    return HISTORY_HEADER.size + (np.size(A) + np.size(b) + np.size(x)) * np.result_type(A, b, x).itemsize
+
+
+def write_history_record(file, A, b, x):
+    dtype = np.result_type(A, b, x)
+    file.write(HISTORY_HEADER.pack(dtype.char.encode(), len(A), 0 if b.ndim == 1 else b.shape[1]))
+    for array in (A, b, x):
+        file.write(np.ascontiguousarray(array, dtype=dtype).tobytes())
+
+
+# A header that could not have been written by write_history_record (unknown dtype, or a record larger than
+# HISTORY_RECORD_BYTES or than what is left of the file) is treated like a partly written record.
+def read_history_record(file):
+    header = file.read(HISTORY_HEADER.size)
+    if len(header) < HISTORY_HEADER.size:
+        return None
+    code, n, columns = HISTORY_HEADER.unpack(header)
+    if code.decode("latin-1") not in HISTORY_DTYPES:
+        return None
+    dtype = np.dtype(code.decode())
+    shape = (n,) if columns == 0 else (n, columns)
+    sizes = [n * n, n * max(columns, 1), n * max(columns, 1)]
+    size = sum(sizes) * dtype.itemsize
+    if HISTORY_HEADER.size + size > HISTORY_RECORD_BYTES or size > os.fstat(file.fileno()).st_size - file.tell():
+        return None
+    data = file.read(size)
+    if len(data) < size:
+        return None
+    values = np.frombuffer(data, dtype=dtype)
+    A = values[:sizes[0]].reshape(n, n)
+    b = values[sizes[0]:sizes[0] + sizes[1]].reshape(shape)
+    x = values[sizes[0] + sizes[1]:].reshape(shape)
+    return A, b, x
+
+
+def append_history(path, A, b, x):
+    if history_record_size(A, b, x) > HISTORY_RECORD_BYTES:
+        return
+    with open(path, "ab") as file:
+        if file.tell() == 0:
+            file.write(HISTORY_MAGIC)
+        write_history_record(file, A, b, x)
+
+
+# Returns the last `limit` records. A partly written record at the end is cut off, and once the
+# file holds more than twice `limit` records it is replaced by a copy holding only those, written
+# to a temporary file first so an interrupted rewrite never loses the history.
+def load_history(path, limit):
+    records, count = deque(maxlen=limit), 0
+    try:
+        with open(path, "r+b") as file:
+            if file.read(len(HISTORY_MAGIC)) != HISTORY_MAGIC:
+                return []
+            end = file.tell()
+            while (record := read_history_record(file)) is not None:
+                records.append(record)
+                count += 1
+                end = file.tell()
+            file.truncate(end)
+    except (OSError, ValueError, TypeError):
+        return []
+    if count > 2 * limit:
+        try:
+            with open(path + ".tmp", "wb") as file:
+                file.write(HISTORY_MAGIC)
+                for record in records:
+                    write_history_record(file, *record)
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass
+    return list(records)
@@ -0,0 +1,413 @@
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+try:
+    from scipy import linalg as scipy_linalg
+    from scipy import sparse
+    from scipy.sparse import csgraph
+    from scipy.sparse import linalg as sparse_linalg
+except ImportError:
+    scipy_linalg = sparse = csgraph = sparse_linalg = None
+
+PARALLEL_BLOCK_SIZE = 200
+SPARSE_MIN_SIZE = 64
+SPARSE_MAX_DENSITY = 0.05
+SMALL_BATCH_CHUNK = 8192
+SOLVER_THREADS = min(4, os.cpu_count() or 1)
+
+
+def select_dtype(*arrays, single=False):
+    if all(not np.any(np.imag(array)) for array in arrays):
+        return np.float32 if single else np.float64
+    return np.complex64 if single else np.complex128
+
+
+# Without SciPy the blocks are found by a breadth-first search on the dense pattern of A.
+def connected_components(pattern):
+    n = len(pattern)
+    labels = np.full(n, -1)
+    count = 0
+    for start in range(n):
+        if labels[start] >= 0:
+            continue
+        labels[start] = count
+        frontier = [start]
+        while len(frontier):
+            neighbours = np.flatnonzero(pattern[frontier].any(axis=0) & (labels < 0))
+            labels[neighbours] = count
+            frontier = neighbours
+        count += 1
+    return [np.flatnonzero(labels == k) for k in range(count)]
+
+
+def is_dense(size, nnz):
+    return size < SPARSE_MIN_SIZE or nnz > SPARSE_MAX_DENSITY * size * size
+
+
+# csgraph works on real weights, so the graph gets the pattern of A rather than its (possibly complex) values.
+def pattern_graph(matrix):
+    return sparse.csr_matrix((np.ones(matrix.nnz), matrix.indices, matrix.indptr), shape=matrix.shape)
+
+
+# Splits A into independent blocks (connected components of its graph). Small or dense systems are
+# kept as one block, since neither the split nor a reordering saves anything there.
+def find_blocks(A):
+    n = len(A)
+    nnz = np.count_nonzero(A)
+    if is_dense(n, nnz):
+        return [np.arange(n)], None
+    if csgraph is None:
+        pattern = A != 0
+        return connected_components(pattern | pattern.T), None
+    matrix = sparse.csr_matrix(A)
+    count, labels = csgraph.connected_components(pattern_graph(matrix), directed=False)
+    order = np.argsort(labels, kind="stable")
+    return np.split(order, np.cumsum(np.bincount(labels, minlength=count))[:-1]), matrix
+
+
+# Sparse LU of one block. COLAMD is tried against reverse Cuthill-McKee (natural column order after
+# the symmetric permutation, which keeps a banded block banded) and the factor with less fill is kept.
+def factor_sparse(matrix, nnz):
+    candidates = []
+    perm = csgraph.reverse_cuthill_mckee(pattern_graph(matrix), symmetric_mode=False)
+    for name, permutation, spec in [("COLAMD", None, "COLAMD"), ("reverse Cuthill-McKee", perm, "NATURAL")]:
+        block = matrix if permutation is None else matrix[permutation][:, permutation]
+        factor = sparse_linalg.splu(block.tocsc(), permc_spec=spec)
+        candidates.append((factor.L.nnz + factor.U.nnz - matrix.shape[0] - nnz, name, permutation, factor))
+    fill, name, permutation, factor = min(candidates, key=lambda candidate: candidate[0])
+    return {"ordering": name, "fill": max(fill, 0), "nnz": nnz, "permutation": permutation, "splu": factor, "dtype": matrix.dtype}
+
+
+def factor_block(A, matrix, indices):
+    if matrix is not None:
+        block = matrix[indices][:, indices]
+        if not is_dense(len(indices), block.nnz):
+            return factor_sparse(block, block.nnz)
+    block = A[np.ix_(indices, indices)]
+    if scipy_linalg is None:
+        return {"ordering": "dense", "matrix": block}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", scipy_linalg.LinAlgWarning)
+        lu, piv = scipy_linalg.lu_factor(block)
+    if not np.all(np.diagonal(lu)):
+        raise np.linalg.LinAlgError("Singular matrix")
+    return {"ordering": "dense", "lu": (lu, piv)}
+
+
+# Factors A block by block. Each block records its unknowns ("indices") and how it was factored
+# ("ordering", plus "fill" and "nnz" for sparse blocks). Returns None when A is singular. Without SciPy,
+# dense blocks are only kept here and factored by np.linalg.solve, so singularity shows up at solve time.
+def factorize_system(A):
+    indices, matrix = find_blocks(A)
+    large = [block for block in indices if len(block) >= PARALLEL_BLOCK_SIZE]
+    small = [block for block in indices if len(block) < PARALLEL_BLOCK_SIZE]
+    try:
+        if len(large) > 1:
+            with ThreadPoolExecutor(max_workers=SOLVER_THREADS) as pool:
+                blocks = list(pool.map(lambda block: factor_block(A, matrix, block), large))
+        else:
+            blocks = [factor_block(A, matrix, block) for block in large]
+        blocks += [factor_block(A, matrix, block) for block in small]
+    except (np.linalg.LinAlgError, RuntimeError):
+        return None
+    for block, rows in zip(blocks, large + small):
+        block["indices"] = rows
+    return {"dtype": np.asarray(A).dtype, "blocks": blocks}
+
+
+def solve_factored_block(block, B, trans=False):
+    if "lu" in block:
+        return scipy_linalg.lu_solve(block["lu"], B, trans=int(trans))
+    if "matrix" in block:
+        return np.linalg.solve(block["matrix"].T if trans else block["matrix"], B)
+    factor, perm, mode = block["splu"], block["permutation"], "T" if trans else "N"
+    if perm is not None:
+        B = B[perm]
+    if np.iscomplexobj(B) and not np.issubdtype(block["dtype"], np.complexfloating):
+        X = factor.solve(np.ascontiguousarray(B.real), mode) + 1j * factor.solve(np.ascontiguousarray(B.imag), mode)
+    else:
+        X = factor.solve(np.asarray(B, dtype=block["dtype"]), mode)
+    if perm is None:
+        return X
+    result = np.empty_like(X)
+    result[perm] = X
+    return result
+
+
+# Solves A X = B, or A^T X = B with trans=True, from the factors of factorize_system. B may hold many columns.
+# Returns None when a block turns out to be singular.
+def solve_factored(factors, B, trans=False):
+    B = np.asarray(B)
+    X = np.zeros(B.shape, dtype=np.result_type(factors["dtype"], B))
+    try:
+        for block in factors["blocks"]:
+            rows = block["indices"]
+            X[rows] = solve_factored_block(block, B[rows], trans)
+    except np.linalg.LinAlgError:
+        return None
+    return X
+
+
+# Adjugate (transposed cofactor matrix) and determinant of a stack of n x n matrices, n <= 4.
+# a[i][j] holds entry (i, j) of every matrix in the batch, so each line below is one vectorized
+# operation over the whole batch.
+def small_adjugate(a):
+    n = len(a)
+    if n == 1:
+        return [[np.ones_like(a[0][0])]], a[0][0]
+    if n == 2:
+        return [[a[1][1], -a[0][1]], [-a[1][0], a[0][0]]], a[0][0] * a[1][1] - a[0][1] * a[1][0]
+    if n == 3:
+        adj = [[a[1][1] * a[2][2] - a[1][2] * a[2][1], a[0][2] * a[2][1] - a[0][1] * a[2][2], a[0][1] * a[1][2] - a[0][2] * a[1][1]],
+               [a[1][2] * a[2][0] - a[1][0] * a[2][2], a[0][0] * a[2][2] - a[0][2] * a[2][0], a[0][2] * a[1][0] - a[0][0] * a[1][2]],
+               [a[1][0] * a[2][1] - a[1][1] * a[2][0], a[0][1] * a[2][0] - a[0][0] * a[2][1], a[0][0] * a[1][1] - a[0][1] * a[1][0]]]
+        return adj, a[0][0] * adj[0][0] + a[0][1] * adj[1][0] + a[0][2] * adj[2][0]
+
+    s0 = a[0][0] * a[1][1] - a[1][0] * a[0][1]
+    s1 = a[0][0] * a[1][2] - a[1][0] * a[0][2]
+    s2 = a[0][0] * a[1][3] - a[1][0] * a[0][3]
+    s3 = a[0][1] * a[1][2] - a[1][1] * a[0][2]
+    s4 = a[0][1] * a[1][3] - a[1][1] * a[0][3]
+    s5 = a[0][2] * a[1][3] - a[1][2] * a[0][3]
+    c0 = a[2][0] * a[3][1] - a[3][0] * a[2][1]
+    c1 = a[2][0] * a[3][2] - a[3][0] * a[2][2]
+    c2 = a[2][0] * a[3][3] - a[3][0] * a[2][3]
+    c3 = a[2][1] * a[3][2] - a[3][1] * a[2][2]
+    c4 = a[2][1] * a[3][3] - a[3][1] * a[2][3]
+    c5 = a[2][2] * a[3][3] - a[3][2] * a[2][3]
+    adj = [[a[1][1] * c5 - a[1][2] * c4 + a[1][3] * c3, -a[0][1] * c5 + a[0][2] * c4 - a[0][3] * c3,
+            a[3][1] * s5 - a[3][2] * s4 + a[3][3] * s3, -a[2][1] * s5 + a[2][2] * s4 - a[2][3] * s3],
+           [-a[1][0] * c5 + a[1][2] * c2 - a[1][3] * c1, a[0][0] * c5 - a[0][2] * c2 + a[0][3] * c1,
+            -a[3][0] * s5 + a[3][2] * s2 - a[3][3] * s1, a[2][0] * s5 - a[2][2] * s2 + a[2][3] * s1],
+           [a[1][0] * c4 - a[1][1] * c2 + a[1][3] * c0, -a[0][0] * c4 + a[0][1] * c2 - a[0][3] * c0,
+            a[3][0] * s4 - a[3][1] * s2 + a[3][3] * s0, -a[2][0] * s4 + a[2][1] * s2 - a[2][3] * s0],
+           [-a[1][0] * c3 + a[1][1] * c1 - a[1][2] * c0, a[0][0] * c3 - a[0][1] * c1 + a[0][2] * c0,
+            -a[3][0] * s3 + a[3][1] * s1 - a[3][2] * s0, a[2][0] * s3 - a[2][1] * s1 + a[2][2] * s0]]
+    return adj, s0 * c5 - s1 * c4 + s2 * c3 + s3 * c2 - s4 * c1 + s5 * c0
+
+
+# Solves a batch of systems A[k] x[k] = b[k] with A of shape (..., n, n), n <= 4, by Cramer's rule.
+# This is the batched API, for many small systems at once; a single system is faster with np.linalg.solve.
+# A system counts as singular when |det A| falls to rounding level against Hadamard's bound (product of the
+# row norms), n eps by default, so ill-conditioned but solvable systems still get a solution even in single
+# precision. Singular solutions are returned as NaN and flagged in the mask.
+def solve_small_batch(A, b, rtol=None):
+    A, b = np.asarray(A), np.asarray(b)
+    dtype = np.result_type(A, b, np.float32)
+    A, b = A.astype(dtype, copy=False), b.astype(dtype, copy=False)
+    n, batch = A.shape[-1], A.shape[:-2]
+    if rtol is None:
+        rtol = n * np.finfo(dtype).eps
+    vector = b.ndim == A.ndim - 1
+    columns = () if vector else b.shape[-1:]
+    count = int(np.prod(batch))
+    A, b = A.reshape(count, n, n), b.reshape((count, n) + columns)
+    x = np.empty((count, n) + columns, dtype=dtype)
+    singular = np.empty(count, dtype=bool)
+
+    for start in range(0, count, SMALL_BATCH_CHUNK):
+        chunk = slice(start, start + SMALL_BATCH_CHUNK)
+        a = np.moveaxis(A[chunk], 0, -1).copy()
+        rhs = np.moveaxis(b[chunk], 0, 1).copy()
+        a_chunk = [[a[i, j] for j in range(n)] for i in range(n)]
+        adj, det = small_adjugate(a_chunk)
+        bound = np.prod([np.sqrt(sum(np.abs(a_chunk[i][j]) ** 2 for j in range(n))) for i in range(n)], axis=0)
+        singular[chunk] = np.abs(det) <= rtol * bound
+        scale = np.divide(1, det, out=np.full_like(det, np.nan), where=~singular[chunk])
+        if not vector:
+            adj = [[entry[:, None] for entry in row] for row in adj]
+            scale = scale[:, None]
+        for i in range(n):
+            x[chunk, i] = sum(adj[i][j] * rhs[j] for j in range(n)) * scale
+
+    return x.reshape(batch + (n,) + columns), singular.reshape(batch)
+
+
+# Small or dense systems go straight to np.linalg.solve; the rest are factored block by block.
+def solve_linear_system(A, b, factors=None):
+    if factors is None:
+        if is_dense(len(A), np.count_nonzero(A)):
+            try:
+                return np.linalg.solve(A, b)
+            except np.linalg.LinAlgError:
+                return None
+        factors = factorize_system(A)
+        if factors is None:
+            return None
+    return solve_factored(factors, b)
+
+
+# Thevenin and Norton equivalents seen from each port (p, q) of a nodal system A x = b: A is the node admittance
+# matrix Y (in S), b the injected currents and x the node voltages, with q = None for the reference node. A mesh
+# system (impedances and loop currents) does not fit, since its unknowns are not node voltages. The port excitations are solved together with b as one
+# multi-column right-hand side, so every port shares a single factorization of A. With b of shape (n, m)
+# the voltages and currents get one column per scenario.
+def thevenin_equivalents(A, b, ports, factors=None):
+    factors = factors or factorize_system(A)
+    if factors is None:
+        return None
+    n = len(A)
+    sources = b.reshape(n, -1)
+    E = np.zeros((n, len(ports)), dtype=np.result_type(A, b, np.float32))
+    for k, (p, q) in enumerate(ports):
+        E[p, k] += 1
+        if q is not None:
+            E[q, k] -= 1
+
+    solution = solve_factored(factors, np.column_stack([sources, E]))
+    if solution is None:
+        return None
+    voltage = E.T @ solution[:, :sources.shape[1]]
+    impedance = np.einsum("ik,ik->k", E, solution[:, sources.shape[1]:])
+    if b.ndim == 1:
+        voltage = voltage[:, 0]
+    scale = impedance if b.ndim == 1 else impedance[:, None]
+    current = np.divide(voltage, scale, out=np.full_like(voltage, np.nan), where=scale != 0)
+    admittance = np.divide(1, impedance, out=np.full_like(impedance, np.nan), where=impedance != 0)
+    return {"ports": ports, "voltage": voltage, "impedance": impedance, "current": current, "admittance": admittance}
+
+
+# Derivatives of the selected unknowns x[k] with respect to every entry of A and b by the adjoint method:
+# with A^T lambda_k = e_k, dx[k]/dA[i, j] = -lambda_k[i] x[j] and dx[k]/db[i] = lambda_k[i]. All outputs
+# share one transposed multi-column solve against the factorization of A. The factors and x of an earlier
+# solve can be passed in, so the sensitivities cost one extra back substitution. Only the nonzero entries of A
+# (its elements) are differentiated: "entries" holds their rows and columns and "matrix" one row per output.
+def adjoint_sensitivities(A, b, outputs, factors=None, x=None):
+    factors = factors or factorize_system(A)
+    if factors is None:
+        return None
+    if x is None:
+        x = solve_factored(factors, b)
+    adjoint = None if x is None else solve_factored(factors, np.eye(len(A), dtype=x.dtype)[:, outputs], trans=True)
+    if adjoint is None:
+        return None
+    rows, cols = np.nonzero(A)
+    matrix = adjoint.T[:, rows]
+    matrix *= -x[cols]
+    return {"outputs": outputs, "x": x, "entries": (rows, cols), "matrix": matrix, "source": adjoint.T}
+
+
+# Natural modes (poles) of the pencil (G + s C) v = 0, e.g. an MNA system with inductor currents as unknowns.
+# Shift-invert around sigma = j 2 pi f: if theta is an eigenvalue of (G + sigma C)^-1 C then s = sigma - 1/theta,
+# so the k largest theta are the k poles nearest the target. With SciPy available this runs ARPACK on a sparse
+# LU of G + sigma C, which stays sparse when G and C are given sparse (as read from .mat files; .npz files hold
+# dense arrays). Without SciPy, or when k is close to n, it falls back to dense eigenvalues.
+# The damping ratio of a pole at s = 0 is undefined and reported as NaN.
+def natural_modes(G, C, k=6, frequency=0.0):
+    sigma = 2j * np.pi * frequency
+    n = G.shape[0]
+    try:
+        if sparse_linalg is not None and k < n - 1:
+            factor = sparse_linalg.splu(sparse.csc_matrix(G, dtype=complex) + sigma * sparse.csc_matrix(C))
+            C = sparse.csr_matrix(C)
+            operator = sparse_linalg.LinearOperator((n, n), matvec=lambda v: factor.solve(C @ v), dtype=complex)
+            theta = sparse_linalg.eigs(operator, k=k, which="LM", return_eigenvectors=False)
+        else:
+            G, C = (np.asarray(M.toarray() if hasattr(M, "toarray") else M) for M in (G, C))
+            theta = np.linalg.eigvals(np.linalg.solve(G + sigma * C, C))
+    except (np.linalg.LinAlgError, RuntimeError):
+        return None
+
+    theta = theta[np.abs(theta) > 1e-12 * np.abs(theta).max(initial=0)]
+    poles = sigma - 1 / theta
+    poles = poles[np.argsort(np.abs(poles - sigma), kind="stable")][:k]
+    magnitude = np.abs(poles)
+    damping = np.divide(-poles.real, magnitude, out=np.full_like(magnitude, np.nan), where=magnitude != 0)
+    quality = np.divide(1, 2 * damping, out=np.where(damping <= 0, np.inf, np.nan), where=damping > 0)
+    return {"poles": poles, "frequency": np.abs(poles.imag) / (2 * np.pi), "natural_frequency": magnitude / (2 * np.pi),
+            "damping": damping, "quality": quality}
+
+
+# Defined subcircuits by name. Each entry keeps its definition (Y, ports, J and the instances of other subcircuits
+# it holds) next to its cached port model, so a parent can be rebuilt when one of its children is redefined.
+subcircuits = {}
+
+
+# Kron reduction (Schur complement) onto the port nodes: Y_pp - Y_pi Y_ii^-1 Y_ip, and for the
+# current injections J_p - Y_pi Y_ii^-1 J_i.
+def kron_reduce(Y, ports, J=None):
+    Y = np.asarray(Y)
+    J = np.zeros(len(Y), dtype=Y.dtype) if J is None else np.asarray(J)
+    ports = np.asarray(ports, dtype=int)
+    internal = np.setdiff1d(np.arange(len(Y)), ports)
+    if len(internal) == 0:
+        return Y[np.ix_(ports, ports)], J[ports]
+    factors = factorize_system(Y[np.ix_(internal, internal)])
+    if factors is None:
+        return None
+    eliminated = solve_factored(factors, np.column_stack([Y[np.ix_(internal, ports)], J[internal]]))
+    if eliminated is None:
+        return None
+    coupling = Y[np.ix_(ports, internal)]
+    return Y[np.ix_(ports, ports)] - coupling @ eliminated[:, :-1], J[ports] - coupling @ eliminated[:, -1]
+
+
+# Stamps subcircuit instances into the n-node system (A, b). Each instance is (name, nodes), nodes giving the
+# top-level node of every port in order, with -1 for the reference node. All instances of one subcircuit are
+# stamped together from its cached port model, taken from `library` (the subcircuits registry by default).
+def assemble_hierarchical(n, instances, A=None, b=None, library=None):
+    library = subcircuits if library is None else library
+    groups = {}
+    for name, nodes in instances:
+        if name not in library:
+            raise ValueError(f"Subcircuit {name} is not defined")
+        count = len(library[name]["model"][1])
+        if len(nodes) != count or not all(-1 <= node < n for node in nodes):
+            raise ValueError(f"Instance of {name} on nodes {list(nodes)} needs {count} nodes from -1 to {n - 1}")
+        groups.setdefault(name, []).append(nodes)
+    arrays = [library[name]["model"][0] for name in groups] + [M for M in (A, b) if M is not None]
+    dtype = np.result_type(np.float64, *arrays)
+    A = np.zeros((n, n), dtype=dtype) if A is None else np.array(A, dtype=dtype)
+    b = np.zeros(n, dtype=dtype) if b is None else np.array(b, dtype=dtype)
+
+    for name, node_lists in groups.items():
+        Y, J = library[name]["model"]
+        nodes = np.array(node_lists, dtype=int)
+        rows = np.broadcast_to(nodes[:, :, None], (len(nodes),) + Y.shape)
+        cols = np.broadcast_to(nodes[:, None, :], (len(nodes),) + Y.shape)
+        mask = (rows >= 0) & (cols >= 0)
+        np.add.at(A, (rows[mask], cols[mask]), np.broadcast_to(Y, rows.shape)[mask])
+        np.add.at(b, nodes[nodes >= 0], np.broadcast_to(J, nodes.shape)[nodes >= 0])
+    return A, b
+
+
+def reduce_subcircuit(name, entry, library):
+    Y, J = assemble_hierarchical(len(entry["Y"]), entry["instances"], entry["Y"], entry["J"], library)
+    reduced = kron_reduce(Y, entry["ports"], J)
+    if reduced is None:
+        raise ValueError(f"Subcircuit {name} has floating internal nodes")
+    return reduced
+
+
+def depends_on(name, child):
+    children = subcircuits[name]["children"] if name in subcircuits else set()
+    return child in children or any(depends_on(grandchild, child) for grandchild in children)
+
+
+# Defines a subcircuit from its own node admittance matrix Y and injections J, optionally holding instances of
+# previously defined subcircuits, and caches its reduced port model. The internal nodes are eliminated once here,
+# however many times the subcircuit is instantiated. Redefining a subcircuit rebuilds every subcircuit built from it,
+# children before parents, into a copy of the registry that replaces the stored entries only once all rebuilds succeed.
+def define_subcircuit(name, Y, ports, J=None, instances=()):
+    instances = tuple((child, tuple(nodes)) for child, nodes in instances)
+    children = {child for child, _ in instances}
+    if any(child == name or depends_on(child, name) for child in children):
+        raise ValueError(f"Subcircuit {name} cannot contain itself")
+
+    stale = {name}
+    while parents := {parent for parent, entry in subcircuits.items() if entry["children"] & stale} - stale:
+        stale |= parents
+    library = dict(subcircuits)
+    library[name] = {"Y": np.array(Y), "ports": tuple(ports), "J": None if J is None else np.array(J),
+                     "instances": instances, "children": children}
+    remaining = list(stale)
+    while remaining:
+        ready = [key for key in remaining if not library[key]["children"] & set(remaining)]
+        for key in ready:
+            library[key] = dict(library[key], model=reduce_subcircuit(key, library[key], library))
+            remaining.remove(key)
+    subcircuits.update((key, library[key]) for key in stale)
+    return library[name]["model"]
@@ -0,0 +1,140 @@
+import os
+
+import numpy as np
+import pytest
+
+from CircuitIO import (HISTORY_HEADER, HISTORY_RECORD_BYTES, append_history, load_history, load_system, parse_complex,
+                       parse_system_text, save_system)
+
+A = np.array([[4.0, -1.0, 0.0], [-1.0, 4.0, -1.0], [0.0, -1.0, 4.0]])
+b = np.array([1.0, 0.5, -2.25])
+
+
+@pytest.mark.parametrize("extension", [".csv", ".txt", ".m", ".npy", ".npz", ".mat"])
+@pytest.mark.parametrize("system", [
+    (A, b),
+    (A * (1 - 2j), b + 0.5j),
+    (A, np.column_stack([b, 2 * b])),
+], ids=["real", "complex", "scenarios"])
+def test_save_and_load_round_trip(tmp_path, extension, system):
+    if extension == ".mat":
+        pytest.importorskip("scipy")
+    path = str(tmp_path / f"system{extension}")
+    save_system(path, *system)
+    A_loaded, b_loaded = load_system(path)
+    np.testing.assert_array_equal(A_loaded, system[0])
+    np.testing.assert_array_equal(b_loaded, system[1])
+
+
+# MATLAB saves sparse matrices as sparse, and loadmat hands them back as SciPy sparse objects.
+@pytest.mark.parametrize("sparse_b", [False, True])
+def test_load_sparse_mat(tmp_path, sparse_b):
+    scipy_io = pytest.importorskip("scipy.io")
+    from scipy import sparse
+    path = str(tmp_path / "system.mat")
+    scipy_io.savemat(path, {"A": sparse.csc_matrix(A), "b": sparse.csc_matrix(b[:, None]) if sparse_b else b[:, None]})
+    A_loaded, b_loaded = load_system(path)
+    np.testing.assert_array_equal(A_loaded, A)
+    np.testing.assert_array_equal(b_loaded, b)
+
+
+@pytest.mark.parametrize("text", [
+    "4,-1,0,1\n-1,4,-1,0.5\n0,-1,4,-2.25",
+    "# augmented\n4 -1 0 1\n-1 4 -1 0.5\n0 -1 4 -2.25\n",
+    "[4 -1 0 1; -1 4 -1 0.5; 0 -1 4 -2.25]",
+    "A = [4 -1 0; -1 4 -1; 0 -1 4];\nb = [1; 0.5; -2.25];",
+])
+def test_parse_system_text(text):
+    A_parsed, b_parsed = parse_system_text(text)
+    np.testing.assert_array_equal(A_parsed, A)
+    np.testing.assert_array_equal(b_parsed, b)
+
+
+def test_parse_complex():
+    assert parse_complex("3 + j4") == 3 + 4j
+    assert parse_complex("-2i") == -2j
+    assert parse_complex("1,000") == 1000.0
+
+
+def test_parse_rejects_ragged_rows():
+    with pytest.raises(ValueError):
+        parse_system_text("1 2 3\n4 5")
+
+
+def test_history_round_trip(tmp_path):
+    path = str(tmp_path / "history")
+    for k in range(5):
+        append_history(path, A * k, b, b / (k + 1))
+    records = load_history(path, 3)
+    assert len(records) == 3
+    for k, (A_record, b_record, x_record) in zip(range(2, 5), records):
+        np.testing.assert_array_equal(A_record, A * k)
+        np.testing.assert_array_equal(x_record, b / (k + 1))
+
+
+@pytest.mark.parametrize("cut", [1, 7, 40])
+def test_history_truncated_tail(tmp_path, cut):
+    path = str(tmp_path / "history")
+    append_history(path, A, b, b)
+    append_history(path, A * 1j, b, b)
+    with open(path, "r+b") as file:
+        file.truncate(os.path.getsize(path) - cut)
+
+    records = load_history(path, 10)
+    assert len(records) == 1
+    np.testing.assert_array_equal(records[0][0], A)
+
+    append_history(path, 2 * A, b, b)
+    records = load_history(path, 10)
+    assert len(records) == 2
+    np.testing.assert_array_equal(records[1][0], 2 * A)
+
+
+@pytest.mark.parametrize("header", [
+    HISTORY_HEADER.pack(b"x", 3, 0),
+    HISTORY_HEADER.pack(b"O", 3, 0),
+    HISTORY_HEADER.pack(b"d", 0x7fffffff, 0),
+    HISTORY_HEADER.pack(b"d", 3, 0x7fffffff),
+    HISTORY_HEADER.pack(b"d", 40, 0),
+], ids=["dtype", "object dtype", "huge n", "huge columns", "past end"])
+def test_history_corrupted_header(tmp_path, header):
+    path = str(tmp_path / "history")
+    append_history(path, A, b, b)
+    with open(path, "ab") as file:
+        file.write(header + bytes(200))
+    append_history(path, 2 * A, b, b)
+
+    records = load_history(path, 10)
+    assert len(records) == 1
+    np.testing.assert_array_equal(records[0][0], A)
+
+    append_history(path, 3 * A, b, b)
+    assert len(load_history(path, 10)) == 2
+
+
+def test_history_compaction(tmp_path):
+    path = str(tmp_path / "history")
+    for k in range(7):
+        append_history(path, A * k, b, b)
+    size = os.path.getsize(path)
+    assert len(load_history(path, 3)) == 3
+    assert os.path.getsize(path) < size
+    assert sorted(os.listdir(tmp_path)) == ["history"]
+    np.testing.assert_array_equal(load_history(path, 3)[0][0], A * 4)
+
+
+def test_history_skips_oversized_records(tmp_path):
+    path = str(tmp_path / "history")
+    n = int(np.sqrt(HISTORY_RECORD_BYTES / 8)) + 1
+    append_history(path, np.eye(n), np.ones(n), np.ones(n))
+    append_history(path, A, b, b)
+    records = load_history(path, 10)
+    assert len(records) == 1
+    np.testing.assert_array_equal(records[0][0], A)
+
+
+def test_history_ignores_foreign_files(tmp_path):
+    path = tmp_path / "history"
+    path.write_bytes(b"not a history file")
+    assert load_history(str(path), 10) == []
+    assert load_history(str(tmp_path / "missing"), 10) == []
@@ -0,0 +1,254 @@
+import numpy as np
+import pytest
+
+from CircuitSolver import (adjoint_sensitivities, assemble_hierarchical, define_subcircuit, factorize_system, kron_reduce,
+                           natural_modes, solve_factored, solve_linear_system, solve_small_batch, subcircuits,
+                           thevenin_equivalents)
+
+rng = np.random.default_rng(0)
+
+
+def ladder(n, dtype=float):
+    A = np.zeros((n, n), dtype=dtype)
+    i = np.arange(n)
+    A[i, i] = 3
+    A[i[:-1], i[:-1] + 1] = A[i[1:], i[1:] - 1] = -1
+    return A
+
+
+def block_diagonal(blocks):
+    n = sum(len(block) for block in blocks)
+    A = np.zeros((n, n), dtype=np.result_type(*blocks))
+    start = 0
+    for block in blocks:
+        A[start:start + len(block), start:start + len(block)] = block
+        start += len(block)
+    return A
+
+
+systems = {
+    "small": rng.normal(size=(3, 3)) + 3 * np.eye(3),
+    "dense": rng.normal(size=(120, 120)) + 12 * np.eye(120),
+    "ladder": ladder(400),
+    "complex ladder": ladder(400, complex) * (1 + 0.5j),
+    "blocks": block_diagonal([ladder(100), rng.normal(size=(40, 40)) + 8 * np.eye(40), ladder(150)]),
+}
+
+
+@pytest.mark.parametrize("name", systems)
+@pytest.mark.parametrize("columns", [None, 3])
+def test_solve_matches_numpy(name, columns):
+    A = systems[name]
+    b = rng.normal(size=len(A) if columns is None else (len(A), columns))
+    np.testing.assert_allclose(solve_linear_system(A, b), np.linalg.solve(A, b), atol=1e-10)
+
+    factors = factorize_system(A)
+    np.testing.assert_allclose(solve_linear_system(A, b, factors), np.linalg.solve(A, b), atol=1e-10)
+    np.testing.assert_allclose(solve_factored(factors, b, trans=True), np.linalg.solve(A.T, b), atol=1e-10)
+
+
+def test_blocks_cover_every_unknown():
+    factors = factorize_system(systems["blocks"])
+    indices = np.sort(np.concatenate([block["indices"] for block in factors["blocks"]]))
+    assert len(factors["blocks"]) == 3
+    np.testing.assert_array_equal(indices, np.arange(len(systems["blocks"])))
+
+
+def test_sparse_blocks_report_fill():
+    pytest.importorskip("scipy")
+    block, = factorize_system(systems["ladder"])["blocks"]
+    assert block["ordering"] in ("COLAMD", "reverse Cuthill-McKee")
+    assert block["nnz"] == np.count_nonzero(systems["ladder"])
+    assert block["fill"] == 0
+
+
+def test_small_systems_are_one_dense_block():
+    block, = factorize_system(np.diag([1.0, 2.0, 3.0]))["blocks"]
+    assert block["ordering"] == "dense"
+    assert "fill" not in block
+
+
+@pytest.mark.parametrize("A", [
+    np.array([[1.0, 2.0], [2.0, 4.0]]),
+    np.array([[1.0, 2.0, 3.0], [4.0, 5.0, 6.0], [0.0, 0.0, 0.0]]),
+    block_diagonal([ladder(100), np.zeros((100, 100))]),
+], ids=["dense", "zero row", "sparse block"])
+def test_singular_systems(A):
+    factors = factorize_system(A)
+    assert factors is None or solve_factored(factors, np.ones(len(A))) is None
+    assert solve_linear_system(A, np.ones(len(A))) is None
+
+
+def test_small_batch_matches_numpy():
+    A = rng.normal(size=(50, 4, 4)) + 4 * np.eye(4)
+    b = rng.normal(size=(50, 4))
+    x, singular = solve_small_batch(A, b)
+    assert not singular.any()
+    np.testing.assert_allclose(x, np.linalg.solve(A, b[..., None])[..., 0], atol=1e-12)
+
+
+def test_small_batch_singular_and_ill_conditioned():
+    A = np.array([[[1, 1], [1, 1.0001]], [[1, 2], [2, 4]]], dtype=np.float32)
+    x, singular = solve_small_batch(A, np.array([[2, 2.0001], [1, 1]], dtype=np.float32))
+    np.testing.assert_array_equal(singular, [False, True])
+    np.testing.assert_allclose(x[0], [1, 1], atol=1e-2)
+    assert np.isnan(x[1]).all()
+
+
+def test_adjoint_matches_finite_differences():
+    A = rng.normal(size=(5, 5)) + 5 * np.eye(5)
+    b = rng.normal(size=5)
+    result = adjoint_sensitivities(A, b, [0, 3])
+    x, h = np.linalg.solve(A, b), 1e-7
+    entries = {(i, j): e for e, (i, j) in enumerate(zip(*result["entries"]))}
+
+    for k, output in enumerate([0, 3]):
+        for i, j in [(0, 0), (2, 4), (4, 1)]:
+            A_step = A.copy()
+            A_step[i, j] += h
+            assert result["matrix"][k, entries[i, j]] == pytest.approx((np.linalg.solve(A_step, b)[output] - x[output]) / h, rel=1e-4)
+        b_step = b.copy()
+        b_step[2] += h
+        assert result["source"][k, 2] == pytest.approx((np.linalg.solve(A, b_step)[output] - x[output]) / h, rel=1e-4)
+
+
+def test_adjoint_reuses_factors():
+    A, b = systems["ladder"], rng.normal(size=400)
+    factors = factorize_system(A)
+    x = solve_linear_system(A, b, factors)
+    reused = adjoint_sensitivities(A, b, [5], factors, x)
+    np.testing.assert_allclose(reused["source"], adjoint_sensitivities(A, b, [5])["source"])
+
+
+def test_adjoint_covers_only_nonzero_entries():
+    A, b = systems["ladder"], rng.normal(size=400)
+    result = adjoint_sensitivities(A, b, [5, 6])
+    rows, cols = result["entries"]
+    assert result["matrix"].shape == (2, np.count_nonzero(A))
+    assert np.all(A[rows, cols] != 0)
+
+
+# 1 A into node 1; 1 ohm from node 1 to ground, 2 ohm from node 1 to node 2, 3 ohm from node 2 to ground.
+def test_thevenin_ladder():
+    Y = np.array([[1 + 1 / 2, -1 / 2], [-1 / 2, 1 / 2 + 1 / 3]])
+    result = thevenin_equivalents(Y, np.array([1.0, 0.0]), [(1, None), (0, 1)])
+    np.testing.assert_allclose(result["voltage"], [0.5, 1 / 3])
+    np.testing.assert_allclose(result["impedance"], [1.5, 4 / 3])
+    np.testing.assert_allclose(result["current"], [1 / 3, 0.25])
+    np.testing.assert_allclose(result["admittance"], [2 / 3, 0.75])
+
+
+def test_thevenin_scenarios():
+    Y = systems["ladder"]
+    b = rng.normal(size=(400, 2))
+    result = thevenin_equivalents(Y, b, [(10, None)])
+    assert result["voltage"].shape == (1, 2)
+    np.testing.assert_allclose(result["voltage"][0], np.linalg.solve(Y, b)[10])
+
+
+# Parallel RLC, R = 1 kohm, L = 1 mH, C = 1 uF: f0 = 5032.9 Hz and Q = 31.6, plus a decoupled pole at s = 0.
+def test_natural_modes_rlc():
+    G = np.array([[1e-3, 1, 0], [-1, 0, 0], [0, 0, 0.0]])
+    C = np.diag([1e-6, 1e-3, 1.0])
+    result = natural_modes(G, C, k=3, frequency=100)
+    np.testing.assert_allclose(result["natural_frequency"][1:], 1 / (2 * np.pi * np.sqrt(1e-3 * 1e-6)))
+    np.testing.assert_allclose(result["quality"][1:], 1000 * np.sqrt(1e-6 / 1e-3))
+    assert result["poles"][0] == pytest.approx(0)
+    assert np.isnan(result["damping"][0]) and np.isnan(result["quality"][0])
+
+
+# Node admittance matrix of resistors given as (node, node, ohms), with -1 for the reference node.
+def resistors(n, branches):
+    Y = np.zeros((n, n))
+    for p, q, ohms in branches:
+        for i, j, sign in [(p, p, 1), (q, q, 1), (p, q, -1), (q, p, -1)]:
+            if i >= 0 and j >= 0:
+                Y[i, j] += sign / ohms
+    return Y
+
+
+@pytest.fixture
+def library():
+    subcircuits.clear()
+    yield subcircuits
+    subcircuits.clear()
+
+
+def test_kron_reduce_keeps_port_voltages():
+    Y = resistors(5, [(0, 2, 1), (2, 3, 2), (3, 1, 3), (2, 4, 4), (4, -1, 5), (3, -1, 6), (1, -1, 7)])
+    J = np.array([1.0, 0.0, 0.5, 0.0, -0.25])
+    Y_reduced, J_reduced = kron_reduce(Y, [0, 1], J)
+    np.testing.assert_allclose(np.linalg.solve(Y_reduced, J_reduced), np.linalg.solve(Y, J)[[0, 1]])
+
+
+def test_kron_reduce_floating_internal_node():
+    assert kron_reduce(resistors(3, [(0, 1, 1), (1, -1, 1)]), [0, 1]) is None
+
+
+# Two-port T section: 1 ohm, 1 ohm in series with an internal node tied to the reference through 2 ohm.
+def tee_section():
+    return resistors(3, [(0, 2, 1), (2, 1, 1), (2, -1, 2)])
+
+
+def test_hierarchical_matches_flat_circuit(library):
+    define_subcircuit("tee", tee_section(), [0, 1])
+    define_subcircuit("ladder", np.zeros((3, 3)), [0, 2], instances=[("tee", [0, 1]), ("tee", [1, 2])])
+    A, b = assemble_hierarchical(3, [("ladder", [0, 1]), ("tee", [1, 2]), ("tee", [2, -1])], b=np.array([1.0, 0, 0]))
+
+    flat = resistors(8, [(0, 3, 1), (3, 4, 1), (3, -1, 2), (4, 5, 1), (5, 1, 1), (5, -1, 2),
+                         (1, 6, 1), (6, 2, 1), (6, -1, 2), (2, 7, 1), (7, -1, 1), (7, -1, 2)])
+    J = np.zeros(8)
+    J[0] = 1
+    np.testing.assert_allclose(np.linalg.solve(A, b), np.linalg.solve(flat, J)[:3])
+
+
+def test_redefining_a_child_rebuilds_its_parents(library):
+    define_subcircuit("tee", tee_section(), [0, 1])
+    define_subcircuit("pair", np.zeros((3, 3)), [0, 2], instances=[("tee", [0, 1]), ("tee", [1, 2])])
+    define_subcircuit("top", np.zeros((2, 2)), [0, 1], instances=[("pair", [0, 1])])
+    before = {name: library[name]["model"][0].copy() for name in ("pair", "top")}
+
+    define_subcircuit("tee", 2 * tee_section(), [0, 1])
+    for name in ("pair", "top"):
+        np.testing.assert_allclose(library[name]["model"][0], 2 * before[name])
+
+
+def test_subcircuit_errors(library):
+    with pytest.raises(ValueError, match="floating"):
+        define_subcircuit("open", resistors(3, [(0, 1, 1)]), [0, 1])
+    with pytest.raises(ValueError, match="not defined"):
+        define_subcircuit("parent", np.zeros((2, 2)), [0, 1], instances=[("missing", [0, 1])])
+    define_subcircuit("tee", tee_section(), [0, 1])
+    define_subcircuit("pair", np.zeros((3, 3)), [0, 2], instances=[("tee", [0, 1]), ("tee", [1, 2])])
+    with pytest.raises(ValueError, match="contain itself"):
+        define_subcircuit("tee", np.zeros((3, 3)), [0, 1], instances=[("pair", [0, 1])])
+
+
+def test_redefinition_that_fails_leaves_registry_unchanged(library):
+    define_subcircuit("link", resistors(2, [(0, 1, 1)]), [0, 1])
+    define_subcircuit("pair", np.zeros((3, 3)), [0, 2], instances=[("link", [0, 1]), ("link", [1, 2])])
+    before = {name: library[name]["model"][0].copy() for name in ("link", "pair")}
+
+    with pytest.raises(ValueError, match="pair has floating"):
+        define_subcircuit("link", np.zeros((2, 2)), [0, 1])
+    np.testing.assert_array_equal(library["link"]["Y"], resistors(2, [(0, 1, 1)]))
+    for name in ("link", "pair"):
+        np.testing.assert_array_equal(library[name]["model"][0], before[name])
+
+
+def test_registry_copies_caller_buffers(library):
+    define_subcircuit("tee", tee_section(), [0, 1])
+    buffer = np.zeros((3, 3))
+    define_subcircuit("pair", buffer, [0, 2], instances=[("tee", [0, 1]), ("tee", [1, 2])])
+    before = library["pair"]["model"][0].copy()
+
+    buffer[:] = 1
+    define_subcircuit("tee", 2 * tee_section(), [0, 1])
+    np.testing.assert_allclose(library["pair"]["model"][0], 2 * before)
+
+
+@pytest.mark.parametrize("nodes", [[0, 3], [-2, 1], [0]], ids=["past end", "below reference", "port count"])
+def test_instance_nodes_are_checked(library, nodes):
+    define_subcircuit("tee", tee_section(), [0, 1])
+    with pytest.raises(ValueError, match="Instance of tee"):
+        assemble_hierarchical(3, [("tee", nodes)])
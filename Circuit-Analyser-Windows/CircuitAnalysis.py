@@ -2,12 +2,16 @@ import os
 import re
 import sys
 import webbrowser
-from tkinter import PhotoImage
+from collections import deque
+from tkinter import Entry, PhotoImage, filedialog
 
 import customtkinter as ctk
 import numpy as np
 from PIL import Image
 
+from CircuitIO import HISTORY_RECORD_BYTES, append_history, history_record_size, load_history, load_pencil, load_system, parse_complex, parse_system_text, save_system
+from CircuitSolver import adjoint_sensitivities, factorize_system, is_dense, natural_modes, select_dtype, solve_linear_system, thevenin_equivalents
+
 ctk.set_appearance_mode("dark")
 ctk.set_default_color_theme("blue")
 
@@ -34,6 +38,13 @@ except Exception:
     github_icon_image = None
 
 
+HISTORY_PATH = os.path.join(os.path.expanduser("~"), ".circuit_analysis_history")
+HISTORY_LIMIT = 200
+SENSITIVITY_OUTPUTS = 10
+SENSITIVITY_LINES = 20
+SHORTCUT_MODIFIERS = 0x4 | (0x8 if sys.platform == "darwin" else 0)
+
+
 def resource_path(relative_path):
     try:
         return os.path.join(sys._MEIPASS, relative_path)
@@ -43,6 +54,11 @@ def resource_path(relative_path):
 
 matrix_entries, vector_entries = [], []
 matrix_frame = vector_frame = button_row = None
+loaded_system = None
+loaded_grid = None
+last_solution = None
+history = deque(load_history(HISTORY_PATH, HISTORY_LIMIT), maxlen=HISTORY_LIMIT)
+history_position = None
 precision_var = ctk.StringVar(value="3")
 
 scrollable_frame = ctk.CTkScrollableFrame(root, width=530, height=880)
@@ -62,32 +78,49 @@ def toggle_theme():
     ctk.set_appearance_mode(mode)
 
 
-def solve_linear_system(A, b):
-    try:
-        return np.linalg.solve(A, b)
-    except np.linalg.LinAlgError:
-        return None
-
-
 def clear_previous_inputs():
-    global matrix_frame, vector_frame, matrix_entries, vector_entries, button_row
+    global matrix_frame, vector_frame, matrix_entries, vector_entries, button_row, loaded_system, history_position
     for frame in [matrix_frame, vector_frame, button_row]:
         if frame: frame.destroy()
     matrix_entries, vector_entries = [], []
+    loaded_system = history_position = None
     output_textbox.configure(state="normal")
     output_textbox.delete("1.0", "end")
     output_textbox.insert("1.0", "Enter values (real/complex rectangular) in matrices and click Solve.")
     output_textbox.configure(state="disabled")
 
 
+def grid_text():
+    return [entry.get() for row in matrix_entries + vector_entries for entry in row]
+
+
+# A loaded system stays in use until the user actually edits a cell; Tab, arrows or modifiers alone keep it.
+def discard_loaded_system(event=None):
+    global loaded_system
+    if loaded_system is not None and grid_text() != loaded_grid:
+        loaded_system = None
+
+
 def create_entry(parent, text, row, col):
     entry = ctk.CTkEntry(parent, width=100, placeholder_text=text, justify="center")
     entry.grid(row=row, column=col, padx=5, pady=2)
+    entry.bind("<KeyRelease>", discard_loaded_system)
     return entry
 
 
+def create_button_row():
+    global button_row
+    button_row = ctk.CTkFrame(scrollable_frame)
+    button_row.pack(pady=10)
+
+    ctk.CTkButton(button_row, text="Solve (Enter)", command=solve_and_display, font=("Arial", 12, "bold"), fg_color="#66BB6A", hover_color="#2B4D2C").pack(side="left", padx=10)
+    ctk.CTkButton(button_row, text="Reset (R)", command=create_input_fields, font=("Arial", 12, "bold"), fg_color="#EF5350", hover_color="#692625").pack(side="left", padx=10)
+    ctk.CTkButton(button_row, text="Thevenin (T)", command=thevenin_and_display, font=("Arial", 12, "bold")).pack(side="left", padx=10)
+    ctk.CTkButton(button_row, text="Sensitivity (S)", command=sensitivity_and_display, font=("Arial", 12, "bold")).pack(side="left", padx=10)
+
+
 def create_input_fields():
-    global matrix_frame, vector_frame, matrix_entries, vector_entries, button_row
+    global matrix_frame, vector_frame, matrix_entries, vector_entries
     try:
         n = int(size_dropdown.get())
         if not 1 <= n <= 4:
@@ -99,6 +132,7 @@ def create_input_fields():
         root.bell()
         return
 
+    m = int(scenario_dropdown.get())
     clear_previous_inputs()
 
     matrix_frame = ctk.CTkFrame(scrollable_frame)
@@ -115,28 +149,71 @@ def create_input_fields():
         ctk.CTkLabel(matrix_frame, text="]", font=("Courier", 25, "bold"), width=10).grid(row=i + 1, column=n + 1)
         matrix_entries.append(row_entries)
 
-    ctk.CTkLabel(vector_frame, text=f"Constants Vector b ({n}x1):", font=("Arial", 14, "bold")).grid(row=0, column=0, columnspan=3, pady=5)
+    title = f"Constants Vector b ({n}x1):" if m == 1 else f"Constants b ({n}x{m}, one column per scenario):"
+    ctk.CTkLabel(vector_frame, text=title, font=("Arial", 14, "bold")).grid(row=0, column=0, columnspan=m + 2, pady=5)
     for i in range(n):
+        row_entries = []
         ctk.CTkLabel(vector_frame, text="[", font=("Courier", 25, "bold"), width=10).grid(row=i + 1, column=0)
-        vector_entries.append(create_entry(vector_frame, f"b{i + 1}", i + 1, 1))
-        ctk.CTkLabel(vector_frame, text="]", font=("Courier", 25, "bold"), width=10).grid(row=i + 1, column=2)
-    button_row = ctk.CTkFrame(scrollable_frame)
-    button_row.pack(pady=10)
+        for k in range(m):
+            row_entries.append(create_entry(vector_frame, f"b{i + 1}" if m == 1 else f"b{i + 1}{k + 1}", i + 1, k + 1))
+        ctk.CTkLabel(vector_frame, text="]", font=("Courier", 25, "bold"), width=10).grid(row=i + 1, column=m + 1)
+        vector_entries.append(row_entries)
+    create_button_row()
 
-    ctk.CTkButton(button_row, text="Solve (Enter)", command=solve_and_display, font=("Arial", 12, "bold"), fg_color="#66BB6A", hover_color="#2B4D2C").pack(side="left", padx=10)
-    ctk.CTkButton(button_row, text="Reset (R)", command=create_input_fields, font=("Arial", 12, "bold"), fg_color="#EF5350", hover_color="#692625").pack(side="left", padx=10)
+def parse_ports(text, n):
+    ports = []
+    for item in re.split(r'[,;]', text):
+        item = re.sub(r'\s+', '', item)
+        if not item:
+            continue
+        nodes = [int(node) for node in item.split('-')]
+        if len(nodes) > 2 or not all(0 <= node <= n for node in nodes) or nodes[0] == 0:
+            raise ValueError(f"Invalid port: {item}")
+        ports.append((nodes[0] - 1, nodes[1] - 1 if len(nodes) == 2 and nodes[1] != 0 else None))
+    if not ports:
+        raise ValueError("No ports given")
+    return ports
 
-def parse_complex(value):
-    try:
-        val = value.lower().replace('i', 'j')
-        val = val.replace(',', "")
-        val = re.sub(r'\s+', '', val)
-        val = re.sub(r'(?<![\d.])j(\d+(\.\d+)?)(?![\d.])', r'\1j', val)
-        val = re.sub(r'(?<=[\+\-])j(?![\d.])', '1j', val)
-        val = re.sub(r'^j$', '1j', val)
-        return complex(val)
-    except Exception:
-        raise ValueError(f"Invalid complex number format: {value}")
+
+def parse_outputs(text, n):
+    outputs = [int(item) - 1 for item in re.findall(r'\d+', text)] or list(range(n))
+    if not all(0 <= k < n for k in outputs):
+        raise ValueError(f"Invalid outputs: {text}")
+    return outputs
+
+
+def format_complex(value, fmt):
+    if abs(value.imag) < 1e-10:
+        return f"{value.real:{fmt}}"
+    return f"{value.real:{fmt}} {'+' if value.imag >= 0 else '-'} {abs(value.imag):{fmt}}j"
+
+
+def format_ratio(value, fmt):
+    return "n/a" if np.isnan(value) else f"{value:{fmt}}"
+
+
+def system_size():
+    return len(loaded_system[0]) if loaded_system is not None else len(matrix_entries)
+
+
+def format_values(values, fmt):
+    if np.ndim(values) == 0:
+        return format_complex(values, fmt)
+    return "[" + ", ".join(format_complex(value, fmt) for value in values) + "]"
+
+
+def read_system():
+    if loaded_system is not None:
+        A, b = loaded_system
+        dtype = select_dtype(A, b, single=single_switch.get())
+        return A.astype(dtype, copy=False), b.astype(dtype, copy=False)
+
+    A_values = [[parse_complex(val) if (val := entry.get()) else 0 for entry in row] for row in matrix_entries]
+    b_values = [[parse_complex(val) if (val := entry.get()) else 0 for entry in row] for row in vector_entries]
+
+    dtype = select_dtype(A_values, b_values, single=single_switch.get())
+    b = np.array(b_values, dtype=dtype)
+    return np.array(A_values, dtype=dtype), (b[:, 0] if b.shape[1] == 1 else b)
 
 
 def show_output(message):
@@ -146,67 +223,314 @@ def show_output(message):
     output_textbox.configure(state="disabled")
 
 
+def display_solution(A, b, x, factors=None, heading=None):
+    n = len(A)
+    precision = int(precision_var.get())
+    fmt = f".{precision}f"
+
+    if x.ndim == 2:
+        result_lines = [" | ".join(f"Scenario {k + 1}" for k in range(x.shape[1]))]
+        result_lines += [f"I{i + 1} = " + " | ".join(f"{format_complex(value, fmt)} A" for value in x[i]) for i in range(n)]
+    elif np.iscomplexobj(x):
+        result_lines = [
+            f"I{i + 1} = {x[i].real:.{precision}f} + {x[i].imag:.{precision}f}j A       [ {np.abs(x[i]):.{precision}f} ∠ {np.degrees(np.angle(x[i])):.{precision}f}° A ]"
+            for i in range(n)]
+    else:
+        result_lines = [f"I{i + 1} = {x[i]:.{precision}f} A" for i in range(n)]
+
+    kvl_lines = []
+    for i in range(n if matrix_entries else 0):
+        terms = []
+        for j in range(n):
+            coeff = A[i, j]
+            if coeff != 0:
+                real, imag = coeff.real, coeff.imag
+                if abs(imag) < 1e-10:
+                    term = f"{real:{fmt}} Ω * I{j + 1}"
+                elif abs(real) < 1e-10:
+                    term = f"{imag:{fmt}}j Ω * I{j + 1}"
+                else:
+                    term = f"({real:{fmt}} {'+' if imag >= 0 else '-'} {abs(imag):{fmt}}j) Ω * I{j + 1}"
+                terms.append(term)
+        kvl_lines.append(" + ".join(terms) + f" = {format_values(b[i], fmt)} V")
+
+    output_textbox.configure(state="normal")
+    output_textbox.delete("1.0", "end")
+    if heading:
+        output_textbox.insert("end", heading + "\n\n")
+    output_textbox.insert("end", "Solution:\n" + "\n".join(result_lines))
+    if kvl_lines:
+        output_textbox.insert("end", "\n\nKVL Equations:\n" + "\n".join(kvl_lines))
+    blocks = factors["blocks"] if factors else []
+    if len(blocks) > 1 or any("fill" in block for block in blocks):
+        structure_lines = [
+            f"Block {k + 1} ({', '.join(f'I{i + 1}' for i in block['indices'])}): "
+            + (f"{block['ordering']} ordering, fill-in {block['fill']} on {block['nnz']} nonzeros" if "fill" in block
+               else f"dense LU on {len(block['indices'])} unknowns")
+            for k, block in enumerate(blocks)]
+        output_textbox.insert("end", "\n\nStructure:\n" + "\n".join(structure_lines))
+    output_textbox.configure(state="disabled")
+
+
+# Factors and solution of the last solve, reused by Thevenin and Sensitivity while the system is unchanged.
+# Small or dense systems are solved without keeping factors, so they are factored here on first use.
+def cached_solution(A, b):
+    global last_solution
+    if last_solution is not None:
+        A_last, b_last, factors, x = last_solution
+        if A_last.dtype == A.dtype and np.array_equal(A_last, A) and np.array_equal(b_last, b):
+            if factors is None:
+                factors = factorize_system(A)
+                last_solution = (A_last, b_last, factors, x)
+            return factors, x
+    return None, None
+
+
 def solve_and_display():
+    global last_solution
     try:
-        n = len(matrix_entries)
-        if n == 0:
+        if system_size() == 0:
             show_output("Error: Create input fields first.")
             root.bell()
             return
 
-        precision = int(precision_var.get())
-        fmt = f".{precision}f"
-
-        A = np.zeros((n, n), dtype=complex)
-        b = np.zeros(n, dtype=complex)
-
-        for i in range(n):
-            for j in range(n):
-                val = matrix_entries[i][j].get()
-                A[i, j] = parse_complex(val) if val else 0
-
-        for i in range(n):
-            val = vector_entries[i].get()
-            b[i] = parse_complex(val) if val else 0
-
-        x = solve_linear_system(A, b)
+        A, b = read_system()
+        if is_dense(len(A), np.count_nonzero(A)):
+            factors, x = None, solve_linear_system(A, b)
+        else:
+            factors = factorize_system(A)
+            x = None if factors is None else solve_linear_system(A, b, factors)
         if x is None:
             show_output("Error: The system has no solution.\n(singular matrix or invalid inputs)")
             root.bell()
             return
 
-        result_lines = [
-            f"I{i + 1} = {x[i].real:.{precision}f} + {x[i].imag:.{precision}f}j A       [ {np.abs(x[i]):.{precision}f} ∠ {np.degrees(np.angle(x[i])):.{precision}f}° A ]"
-            for i in range(n)]
+        last_solution = (A, b, factors, x)
+        record_history(A, b, x)
+        display_solution(A, b, x, factors)
+
+    except Exception:
+        show_output("Error: Invalid input format.")
+        root.bell()
+
+
+def record_history(A, b, x):
+    global history_position
+    history_position = None
+    if history_record_size(A, b, x) > HISTORY_RECORD_BYTES:
+        return
+    history.append((A, b, x))
+    try:
+        append_history(HISTORY_PATH, A, b, x)
+    except OSError:
+        pass
+
+
+def recall_history(step):
+    global history_position
+    if not history:
+        show_output("Error: No solved systems in history.")
+        root.bell()
+        return
+    position = len(history) if history_position is None else history_position
+    position = min(max(position + step, 0), len(history) - 1)
+    A, b, x = history[position]
+    show_system(A, b)
+    history_position = position
+    display_solution(A, b, x, heading=f"History {position + 1} of {len(history)}")
+
+
+def thevenin_and_display():
+    n = system_size()
+    if n == 0:
+        show_output("Error: Create input fields first.")
+        root.bell()
+        return
+
+    text = ctk.CTkInputDialog(text="Nodal analysis: A is the admittance matrix Y (S), b the injected currents (A).\n"
+                                   "Ports as node pairs, 0 = reference (e.g. 1, 2-3):", title="Thevenin / Norton").get_input()
+    if not text:
+        return
+
+    try:
+        ports = parse_ports(text, n)
+        A, b = read_system()
+    except Exception:
+        show_output("Error: Invalid input format.")
+        root.bell()
+        return
 
-        kvl_lines = []
+    result = thevenin_equivalents(A, b, ports, cached_solution(A, b)[0])
+    if result is None:
+        show_output("Error: The system has no solution.\n(singular matrix or invalid inputs)")
+        root.bell()
+        return
+
+    fmt = f".{int(precision_var.get())}f"
+    lines = []
+    for k, (p, q) in enumerate(ports):
+        lines.append(
+            f"Port {p + 1}-{0 if q is None else q + 1}: Vth = {format_values(result['voltage'][k], fmt)} V, "
+            f"Zth = {format_complex(result['impedance'][k], fmt)} Ω, In = {format_values(result['current'][k], fmt)} A, "
+            f"Yn = {format_complex(result['admittance'][k], fmt)} S")
+    show_output("Thevenin / Norton Equivalents (A read as nodal Y in S, unknowns as node voltages):\n" + "\n".join(lines))
+
+
+def sensitivity_and_display():
+    n = system_size()
+    if n == 0:
+        show_output("Error: Create input fields first.")
+        root.bell()
+        return
+
+    text = ctk.CTkInputDialog(text=f"Outputs (e.g. I1, I3), leave blank for all (at most {SENSITIVITY_OUTPUTS}):", title="Sensitivity").get_input()
+    if text is None:
+        return
+
+    try:
+        outputs = parse_outputs(text, n)
+        A, b = read_system()
+    except Exception:
+        show_output("Error: Invalid input format.")
+        root.bell()
+        return
+
+    if b.ndim != 1:
+        show_output("Error: Sensitivity works on one scenario at a time.")
+        root.bell()
+        return
+
+    if len(outputs) > SENSITIVITY_OUTPUTS:
+        show_output(f"Error: Choose at most {SENSITIVITY_OUTPUTS} outputs (e.g. I1, I3).")
+        root.bell()
+        return
+
+    try:
+        factors, x = cached_solution(A, b)
+        result = adjoint_sensitivities(A, b, outputs, factors, x)
+    except MemoryError:
+        show_output("Error: The system is too large for sensitivity analysis.")
+        root.bell()
+        return
+    if result is None:
+        show_output("Error: The system has no solution.\n(singular matrix or invalid inputs)")
+        root.bell()
+        return
+
+    fmt = f".{int(precision_var.get())}f"
+    rows, cols = result["entries"]
+    sections = []
+    for k, output in enumerate(outputs):
+        values = np.concatenate([result["matrix"][k], result["source"][k]])
+        largest = np.argsort(-np.abs(values), kind="stable")[:SENSITIVITY_LINES]
+        names = [f"A{rows[i] + 1}{cols[i] + 1}" if i < len(rows) else f"b{i - len(rows) + 1}" for i in largest]
+        lines = [f"dI{output + 1}/d{name} = {format_complex(values[i], fmt)}" for name, i in zip(names, largest)]
+        sections.append(f"Sensitivity of I{output + 1} (largest {len(largest)} of {len(values)}):\n" + "\n".join(lines))
+    show_output("\n\n".join(sections))
+
+
+def show_system(A, b):
+    global loaded_system, loaded_grid
+    n = len(A)
+    columns = b.reshape(n, -1)
+    if n <= 4 and columns.shape[1] <= 4:
+        size_dropdown.set(str(n))
+        scenario_dropdown.set(str(columns.shape[1]))
+        create_input_fields()
         for i in range(n):
-            terms = []
             for j in range(n):
-                coeff = A[i, j]
-                if coeff != 0:
-                    real, imag = coeff.real, coeff.imag
-                    if abs(imag) < 1e-10:
-                        term = f"{real:{fmt}} Ω * I{j + 1}"
-                    elif abs(real) < 1e-10:
-                        term = f"{imag:{fmt}}j Ω * I{j + 1}"
-                    else:
-                        term = f"({real:{fmt}} {'+' if imag >= 0 else '-'} {abs(imag):{fmt}}j) Ω * I{j + 1}"
-                    terms.append(term)
-            rhs = b[i]
-            rhs_str = f"{rhs.real:{fmt}} {'+' if rhs.imag >= 0 else '-'} {abs(rhs.imag):{fmt}}j" if abs(
-                rhs.imag) >= 1e-10 else f"{rhs.real:{fmt}}"
-            kvl_lines.append(" + ".join(terms) + f" = {rhs_str} V")
-
-        output_textbox.configure(state="normal")
-        output_textbox.delete("1.0", "end")
-        output_textbox.insert("end", "Solution:\n" + "\n".join(result_lines) + "\n\n")
-        output_textbox.insert("end", "KVL Equations:\n" + "\n".join(kvl_lines))
-        output_textbox.configure(state="disabled")
+                if A[i, j] != 0:
+                    matrix_entries[i][j].insert(0, format_complex(A[i, j], ".12g"))
+            for k in range(columns.shape[1]):
+                if columns[i, k] != 0:
+                    vector_entries[i][k].insert(0, format_complex(columns[i, k], ".12g"))
+    else:
+        clear_previous_inputs()
+        create_button_row()
+    loaded_system, loaded_grid = (A, b), grid_text()
+
+
+def set_loaded_system(A, b, source):
+    show_system(A, b)
+    show_output(f"Loaded {len(A)}x{len(A)} system from {source}. Click Solve.")
+
+
+def import_system():
+    path = filedialog.askopenfilename(title="Import System", filetypes=[
+        ("Systems", "*.csv *.txt *.tsv *.m *.mat *.npy *.npz"), ("All Files", "*.*")])
+    if not path:
+        return
+    try:
+        set_loaded_system(*load_system(path), os.path.basename(path))
+    except Exception as error:
+        show_output(f"Error: Could not import system.\n{error}")
+        root.bell()
+
+
+def paste_system():
+    try:
+        set_loaded_system(*parse_system_text(root.clipboard_get()), "clipboard")
+    except Exception as error:
+        show_output(f"Error: Could not paste system.\n{error}")
+        root.bell()
+
 
+def export_system():
+    if system_size() == 0:
+        show_output("Error: Create input fields first.")
+        root.bell()
+        return
+    try:
+        A, b = read_system()
     except Exception:
         show_output("Error: Invalid input format.")
         root.bell()
+        return
+    path = filedialog.asksaveasfilename(title="Export System", defaultextension=".csv", filetypes=[
+        ("CSV", "*.csv"), ("MATLAB Script", "*.m"), ("MATLAB Data", "*.mat"), ("NumPy Array", "*.npy"), ("NumPy Archive", "*.npz")])
+    if not path:
+        return
+    try:
+        save_system(path, A, b)
+    except Exception as error:
+        show_output(f"Error: Could not export system.\n{error}")
+        root.bell()
+        return
+    show_output(f"Exported {len(A)}x{len(A)} system to {os.path.basename(path)}.")
+
+
+def modes_and_display():
+    path = filedialog.askopenfilename(title="Open G and C Matrices", filetypes=[("Matrices", "*.mat *.npz"), ("All Files", "*.*")])
+    if not path:
+        return
+    text = ctk.CTkInputDialog(text="Target frequency in Hz and number of modes (e.g. 1000, 6):", title="Modal Analysis").get_input()
+    if text is None:
+        return
+
+    try:
+        G, C = load_pencil(path)
+        values = [float(value) for value in re.findall(r'[-+]?\d*\.?\d+(?:[eE][-+]?\d+)?', text)]
+        frequency = values[0] if values else 0.0
+        k = int(values[1]) if len(values) > 1 else 6
+        if k < 1:
+            raise ValueError("Number of modes must be positive")
+    except Exception as error:
+        show_output(f"Error: Could not start modal analysis.\n{error}")
+        root.bell()
+        return
+
+    result = natural_modes(G, C, k, frequency)
+    if result is None:
+        show_output("Error: Modal analysis failed.\n(G + sC is singular at the target frequency)")
+        root.bell()
+        return
+
+    fmt = f".{int(precision_var.get())}f"
+    lines = [
+        f"Mode {i + 1}: s = {format_complex(pole, fmt)} 1/s, f = {result['frequency'][i]:{fmt}} Hz, "
+        f"f0 = {result['natural_frequency'][i]:{fmt}} Hz, ζ = {format_ratio(result['damping'][i], fmt)}, Q = {format_ratio(result['quality'][i], fmt)}"
+        for i, pole in enumerate(result["poles"])]
+    show_output(f"Natural Modes nearest {frequency:g} Hz ({G.shape[0]} unknowns):\n" + "\n".join(lines))
 
 
 def copy_result_to_clipboard():
@@ -245,6 +569,9 @@ topmost_switch = ctk.CTkSwitch(switch_frame, text="Always on Top (A)", command=t
 topmost_switch.pack(side="left", padx=10)
 topmost_switch.select()
 
+single_switch = ctk.CTkSwitch(switch_frame, text="Single Precision (F)")
+single_switch.pack(side="left", padx=10)
+
 output_textbox = ctk.CTkTextbox(scrollable_frame, border_width=5, width=500, height=200,
                                 font=("Franklin Gothic Medium", 12), wrap="word")
 output_textbox.pack(pady=10)
@@ -263,6 +590,13 @@ size_dropdown.pack(side="left", padx=(5, 0))
 ctk.CTkButton(size_row1, text="    Confirm Matrix Size (R)    ", font=("Arial", 12, "bold"), command=create_input_fields).pack(side="left",
                                                                                                    padx=(15, 0))
 
+scenario_row = ctk.CTkFrame(size_frame)
+scenario_row.pack(pady=5, fill="x")
+ctk.CTkLabel(scenario_row, text="Scenarios (b columns):", width=150, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+scenario_dropdown = ctk.CTkOptionMenu(scenario_row, values=["1", "2", "3", "4"], width=100)
+scenario_dropdown.set("1")
+scenario_dropdown.pack(side="left", padx=(5, 0))
+
 size_row2 = ctk.CTkFrame(size_frame)
 size_row2.pack(pady=5, fill="x")
 ctk.CTkLabel(size_row2, text="Decimal Precision:", width=150, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
@@ -273,13 +607,37 @@ precision_dropdown.pack(side="left", padx=(5, 0))
 ctk.CTkButton(size_row2, text="Copy Result to Clipboard (C)", command=copy_result_to_clipboard, font=("Arial", 12, "bold")).pack(side="left",
                                                                                                      padx=(15, 0))
 
+size_row3 = ctk.CTkFrame(size_frame)
+size_row3.pack(pady=5, fill="x")
+ctk.CTkButton(size_row3, text="Import (O)", command=import_system, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+ctk.CTkButton(size_row3, text="Paste (V)", command=paste_system, font=("Arial", 12, "bold")).pack(side="left", padx=(15, 0))
+ctk.CTkButton(size_row3, text="Export (X)", command=export_system, font=("Arial", 12, "bold")).pack(side="left", padx=(15, 0))
+
+size_row4 = ctk.CTkFrame(size_frame)
+size_row4.pack(pady=5, fill="x")
+ctk.CTkLabel(size_row4, text="Session History:", width=150, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+ctk.CTkButton(size_row4, text="◀ Previous (P)", command=lambda: recall_history(-1), font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+ctk.CTkButton(size_row4, text="Next (N) ▶", command=lambda: recall_history(1), font=("Arial", 12, "bold")).pack(side="left", padx=(15, 0))
+
+size_row5 = ctk.CTkFrame(size_frame)
+size_row5.pack(pady=5, fill="x")
+ctk.CTkLabel(size_row5, text="Modal Analysis:", width=150, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+ctk.CTkButton(size_row5, text="Natural Modes (M)", command=modes_and_display, font=("Arial", 12, "bold")).pack(side="left", padx=(5, 0))
+
 matrix_frame = ctk.CTkFrame(scrollable_frame)
 matrix_frame.pack(pady=10)
 vector_frame = ctk.CTkFrame(scrollable_frame)
 vector_frame.pack(pady=10)
 
+# Shortcuts are plain keys: Ctrl (and Command on macOS) combinations are left to the focused widget, and
+# letters typed into an entry stay in the entry.
 def on_key_press(event):
-    match event.keysym.lower():
+    if event.state & SHORTCUT_MODIFIERS:
+        return
+    key = event.keysym.lower()
+    if len(key) == 1 and isinstance(event.widget, Entry):
+        return
+    match key:
         case "return" | "kp_enter":
             solve_and_display()
         case "r" | "R":
@@ -292,6 +650,24 @@ def on_key_press(event):
             toggle_theme()
         case "c" | "C":
             copy_result_to_clipboard()
+        case "f" | "F":
+            single_switch.toggle()
+        case "t" | "T":
+            thevenin_and_display()
+        case "s" | "S":
+            sensitivity_and_display()
+        case "o" | "O":
+            import_system()
+        case "v" | "V":
+            paste_system()
+        case "x" | "X":
+            export_system()
+        case "p" | "P":
+            recall_history(-1)
+        case "n" | "N":
+            recall_history(1)
+        case "m" | "M":
+            modes_and_display()
 
 
 root.bind("<Key>", on_key_press)